@@ -1,13 +1,60 @@
+import functools
 import os
 from pathlib import Path
+from typing import Any
 
 import cv2
-from paddlex import create_model
+import numpy as np
 from tqdm import tqdm
 
+from background_writer import get_background_writer
 from page_renderer import create_image_from_part_of_page
 from process_table import PaddleXPostProcessingTable
 
+_MODULE_DIR = Path(__file__).resolve().parent
+_MODELS_DIR = (_MODULE_DIR / "../models").resolve()
+_OUTPUT_DIR = (_MODULE_DIR / "../output").resolve()
+
+# Pages whose difference hashes are closer than this are treated as identical
+_PAGE_HASH_MAX_DISTANCE = 3
+
+
+def _dhash64(image: cv2.typing.MatLike) -> int:
+    """
+    Compute a 64-bit difference hash of an image.
+
+    The image is reduced to 9x8 grayscale and each bit encodes whether a
+    pixel is brighter than its right neighbour, which is stable across tiny
+    rendering differences between otherwise identical pages.
+
+    Args:
+        image (cv2.typing.MatLike): Image to hash.
+
+    Returns:
+        64-bit hash as an integer.
+    """
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+@functools.lru_cache(maxsize=None)
+def get_paddlex_engine(model: str = "PP-DocLayout-L") -> "PaddleXEngine":
+    """
+    Return a cached PaddleXEngine for given layout model.
+
+    Constructing the engine and its predictors re-loads model weights, so the
+    cache keeps each model initialized exactly once per process.
+
+    Args:
+        model (str): One of supported Paddle Layout Models.
+
+    Returns:
+        Cached PaddleXEngine instance.
+    """
+    return PaddleXEngine(model)
+
 
 class PaddleXEngine:
     """
@@ -24,8 +71,9 @@ class PaddleXEngine:
                 - "RT-DETR-H_layout_17cls"
         """
         self.model_name = model
-        model_path = os.path.join(Path(__file__).parent.absolute(), f"../models/{model}")
-        self.model_dir = model_path
+        self.model_dir = str(_MODELS_DIR / model)
+        self._models: dict = {}
+        self._page_cache: dict[int, tuple[tuple, Any]] = {}
         match model:
             case "PP-DocLayout-L":
                 self.threshold = {
@@ -74,14 +122,41 @@ class PaddleXEngine:
                     16: 0.3,  # seal
                 }
 
-    def process_pdf_page_image_with_ai(
-        self,
-        image: cv2.typing.MatLike,
-        id: str,
-        page_number: int,
-        progress_bar: tqdm,
-        max_formulas_and_tables_per_page: int,
-    ) -> dict:
+    def _get_model(self, model_name: str, model_dir: str, **kwargs) -> Any:
+        """
+        Return a cached predictor, creating it on first use.
+
+        Args:
+            model_name (str): Name of the Paddle model.
+            model_dir (str): Directory with the model weights.
+            **kwargs: Additional arguments for predictor creation.
+
+        Returns:
+            Cached predictor instance.
+        """
+        if model_name not in self._models:
+            # Imported here so that commands that never run a model do not
+            # pay the multi-second paddlex import at startup
+            from paddlex import create_model
+            from paddlex.inference import PaddlePredictorOption
+
+            # MKLDNN roughly doubles CPU throughput of the Paddle models
+            # compared to the default backend. Half of the cores are used so
+            # rendering and template creation keep some CPU headroom.
+            option = PaddlePredictorOption()
+            option.run_mode = "mkldnn"
+            option.cpu_threads = max(1, (os.cpu_count() or 2) // 2)
+
+            self._models[model_name] = create_model(
+                model_name=model_name,
+                model_dir=model_dir,
+                device="cpu",
+                pp_option=option,
+                **kwargs,
+            )
+        return self._models[model_name]
+
+    def process_pdf_page_image_with_ai(self, image: cv2.typing.MatLike, id: str, page_number: int) -> dict:
         """
         Let AI do its magic for PDF page image.
 
@@ -89,90 +164,155 @@ class PaddleXEngine:
             image (cv2.typing.MatLike): Rendered image of PDF page.
             id (string): PDF document name.
             page_number (int): Page number.
-            progress_bar (tqdm): Progress bar that we update for each model
-                call.
-            max_formulas_and_tables_per_page (int): Our estimation how many
-                tables and formulas can be in one page.
 
         Returns:
             List of recognized elements with data about possition and type.
         """
-        model = create_model(
-            model_name=self.model_name,
-            model_dir=self.model_dir,
-            device="cpu",
-            threshold=self.threshold,
-        )
+        results = self.process_pdf_page_images_with_ai([image], id, [page_number])
+        return results[0]
 
-        output = model.predict(input=image, batch_size=1, layout_nms=True)
+    def process_pdf_page_images_with_ai(self, images: list, id: str, page_numbers: list) -> list:
+        """
+        Let AI do its magic for a batch of PDF page images.
 
-        for res in output:
-            output_name = f"{id}-page{page_number}.png"
-            output_path = os.path.join(Path(__file__).parent.absolute(), f"../output/{output_name}")
-            res.save_to_img(save_path=output_path)
+        Running layout recognition on all images in one predictor call
+        amortizes model setup and lets PaddleX batch the images on the
+        device instead of processing them one by one.
 
-            table_index = 0
+        Args:
+            images (list): Rendered images of PDF pages.
+            id (string): PDF document name.
+            page_numbers (list): Page number for each image.
 
-            # How many tables and formulas we will process
-            boxes_to_process = len(
-                [box for box in res["boxes"] if box["label"] == "table" or box["label"] == "formula"]
+        Returns:
+            List of per-page results aligned to the input order.
+        """
+        # Reuse results of pages that look identical to an already processed
+        # one (blank pages, repeated forms, ...) instead of re-running models
+        results_by_index: dict[int, dict] = {}
+        hashes: list[int] = []
+        miss_indices: list[int] = []
+        for index, image in enumerate(images):
+            page_hash = _dhash64(image)
+            hashes.append(page_hash)
+            cached = self._find_cached_result(page_hash, image.shape)
+            if cached is not None:
+                results_by_index[index] = cached
+            else:
+                miss_indices.append(index)
+
+        if miss_indices:
+            model = self._get_model(self.model_name, self.model_dir, threshold=self.threshold)
+
+            output = model.predict(
+                input=[images[index] for index in miss_indices], batch_size=len(miss_indices), layout_nms=True
             )
 
-            # Add one box as layout recognition that already passed
-            boxes_to_process += 1
+            processed = 0
+            for res in output:
+                index = miss_indices[processed]
+                result = self._process_layout_result(res, images[index], id, page_numbers[index])
+                results_by_index[index] = result
+                self._page_cache[hashes[index]] = (images[index].shape, result)
+                processed += 1
+
+        # Pages without layout output get an empty result
+        return [results_by_index.get(index, {}) for index in range(len(images))]
+
+    def clear_page_cache(self) -> None:
+        """
+        Forget cached per-page results. Call between documents, since the
+        engine instance is shared through get_paddlex_engine.
+        """
+        self._page_cache.clear()
+
+    def _find_cached_result(self, page_hash: int, shape: tuple) -> Any | None:
+        """
+        Look up the result of an already processed page that is a near
+        duplicate of the given one.
+
+        Args:
+            page_hash (int): Difference hash of the rendered page.
+            shape (tuple): Shape of the rendered page image; results are only
+                reused when dimensions match so coordinates stay valid.
+
+        Returns:
+            Cached result or None when no near duplicate was processed yet.
+        """
+        for cached_hash, (cached_shape, results) in self._page_cache.items():
+            if cached_shape == shape and bin(cached_hash ^ page_hash).count("1") < _PAGE_HASH_MAX_DISTANCE:
+                return results
+        return None
+
+    def _process_layout_result(self, res: Any, image: cv2.typing.MatLike, id: str, page_number: int) -> dict:
+        """
+        Run formula and table models for one layout recognition result.
+
+        Args:
+            res (Any): PaddleX layout recognition result for one page.
+            image (cv2.typing.MatLike): Rendered image of PDF page.
+            id (string): PDF document name.
+            page_number (int): Page number.
+
+        Returns:
+            Layout recognition result enriched with formula and table data.
+        """
+        output_name = f"{id}-page{page_number}.png"
+        output_path = str(_OUTPUT_DIR / output_name)
 
-            # Calculate steps - there will never be division by 0
-            # not all processings are equal in time but at least keep updating the progress bar
-            one_step: int = max_formulas_and_tables_per_page // boxes_to_process
-            last_step: int = max_formulas_and_tables_per_page - (boxes_to_process * one_step)
+        if "boxes" not in res:
+            get_background_writer().submit(functools.partial(res.save_to_img, save_path=output_path))
+            return {}
 
-            # Layout recognition is already done
-            progress_bar.update(one_step)
+        table_index = 0
 
-            if "boxes" in res:
-                for box in res["boxes"]:
-                    match box["label"]:
-                        case "table":
-                            # Get table image
-                            coordinate = box["coordinate"]
-                            table_image = create_image_from_part_of_page(image, coordinate, 1)
+        # How many tables and formulas we will process
+        boxes_to_process = len([box for box in res["boxes"] if box["label"] == "table" or box["label"] == "formula"])
 
-                            # Process table
-                            output_file_name = f"{id}_{page_number}-table{table_index}.png"
-                            output_file_path = os.path.join(
-                                Path(__file__).parent.absolute(), f"../output/{output_file_name}"
-                            )
-                            table_index += 1
-                            table_dict = self._process_table_image_with_ai_v2(table_image, coordinate, output_file_path)
+        # Progress of tables and formulas inside this page
+        progress_bar = tqdm(total=boxes_to_process, desc=f"Page {page_number} tables and formulas", leave=False)
 
-                            # Save as additional data to PaddleX result
-                            box["custom"] = table_dict
+        try:
+            for box in res["boxes"]:
+                match box["label"]:
+                    case "table":
+                        # Get table image
+                        coordinate = box["coordinate"]
+                        table_image = create_image_from_part_of_page(image, coordinate, 1)
 
-                            # Update progress after 1 processed table
-                            progress_bar.update(one_step)
+                        # Process table
+                        output_file_name = f"{id}_{page_number}-table{table_index}.png"
+                        output_file_path = str(_OUTPUT_DIR / output_file_name)
+                        table_index += 1
+                        table_dict = self._process_table_image_with_ai_v2(table_image, coordinate, output_file_path)
 
-                        case "formula":
-                            # Get formula image
-                            coordinate = box["coordinate"]
-                            formula_image = create_image_from_part_of_page(image, coordinate, 1)
+                        # Save as additional data to PaddleX result
+                        box["custom"] = table_dict
 
-                            # Process formula
-                            formula_rec = self.process_formula_image_with_ai(formula_image)
+                        # Update progress after 1 processed table
+                        progress_bar.update(1)
 
-                            # Save as additional data to PaddleX result
-                            box["custom"] = formula_rec
+                    case "formula":
+                        # Get formula image
+                        coordinate = box["coordinate"]
+                        formula_image = create_image_from_part_of_page(image, coordinate, 1)
 
-                            # Update progress after 1 processed formula
-                            progress_bar.update(one_step)
+                        # Process formula
+                        formula_rec = self.process_formula_image_with_ai(formula_image)
 
-                if last_step > 0:
-                    progress_bar.update(last_step)
+                        # Save as additional data to PaddleX result
+                        box["custom"] = formula_rec
 
-                return res
+                        # Update progress after 1 processed formula
+                        progress_bar.update(1)
+        finally:
+            progress_bar.close()
 
-        # No layout output
-        progress_bar.update(max_formulas_and_tables_per_page)
-        return {}
+        # Queue the page visualization only once the boxes are no longer
+        # mutated, so the writer thread never reads res mid-update
+        get_background_writer().submit(functools.partial(res.save_to_img, save_path=output_path))
+
+        return res
 
     def process_formula_image_with_ai(self, image: cv2.typing.MatLike) -> str:
         """
@@ -185,14 +325,10 @@ class PaddleXEngine:
             TBE, currently empty dictionary
         """
         model_name = "PP-FormulaNet-L"
-        model_path = os.path.join(Path(__file__).parent.absolute(), f"../models/{model_name}")
+        model_path = str(_MODELS_DIR / model_name)
 
         # Formula model prediction
-        formula_model = create_model(
-            model_name=model_name,
-            model_dir=model_path,
-            device="cpu",
-        )
+        formula_model = self._get_model(model_name, model_path)
 
         output = formula_model.predict(input=image, batch_size=1)
 
@@ -217,14 +353,10 @@ class PaddleXEngine:
             List of recognized cell elements with additional data
         """
         model_name = "PP-LCNet_x1_0_table_cls"
-        model_path = os.path.join(Path(__file__).parent.absolute(), f"../models/{model_name}")
+        model_path = str(_MODELS_DIR / model_name)
 
         # Table classification model prediction
-        model = create_model(
-            model_name=model_name,
-            model_dir=model_path,
-            device="cpu",
-        )
+        model = self._get_model(model_name, model_path)
 
         output = model.predict(input=image, batch_size=1)
 
@@ -235,18 +367,14 @@ class PaddleXEngine:
             table_cell_model_name = (
                 "RT-DETR-L_wired_table_cell_det" if is_wired else "RT-DETR-L_wireless_table_cell_det"
             )
-            table_cell_model_dir = os.path.join(Path(__file__).parent.absolute(), f"../models/{table_cell_model_name}")
+            table_cell_model_dir = str(_MODELS_DIR / table_cell_model_name)
 
-            table_cell_model = create_model(
-                model_name=table_cell_model_name,
-                model_dir=table_cell_model_dir,
-                device="cpu",
-            )
+            table_cell_model = self._get_model(table_cell_model_name, table_cell_model_dir)
 
             cell_output = table_cell_model.predict(input=image, batch_size=1)
 
             for cell_results in cell_output:
-                cell_results.save_to_img(save_path=output_file_path)
+                get_background_writer().submit(functools.partial(cell_results.save_to_img, save_path=output_file_path))
 
                 # We are processing 1 table so we are expecting just 1 result:
                 post_processing = PaddleXPostProcessingTable()
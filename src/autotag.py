@@ -1,28 +1,131 @@
-import ctypes
-import json
-import os
+import multiprocessing as mp
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 
 from pdfixsdk import (
     GetPdfix,
+    PdfDoc,
     Pdfix,
-    PdfPage,
     PdfTagsParams,
     kDataFormatJson,
+    kPsReadOnly,
     kRotate0,
     kSaveFull,
 )
 from tqdm import tqdm
 
-from ai import PaddleXEngine
+from ai import get_paddlex_engine
+from background_writer import get_background_writer
 from exceptions import (
     PdfixActivationException,
     PdfixAuthorizationException,
     PdfixException,
 )
+from json_utils import dumps_bytes
 from page_renderer import create_image_from_pdf_page
 from template_json import TemplateJsonCreator
 
+_OUTPUT_DIR = (Path(__file__).resolve().parent / "../output").resolve()
+
+# Shared tagging parameters; the SDK only reads from the struct
+_TAGS_PARAMS = PdfTagsParams()
+
+# How many rendered pages are handed to PaddleX in one predictor call
+PADDLEX_BATCH_SIZE = 8
+
+
+def _authorize_pdfix(pdfix: Pdfix, license_name: str, license_key: str) -> None:
+    """
+    Tries to authorize or activate Pdfix license.
+
+    Args:
+        pdfix (Pdfix): Pdfix sdk instance.
+        license_name (string): Pdfix sdk license name (e-mail)
+        license_key (string): Pdfix sdk license key
+    """
+    if license_name and license_key:
+        authorization = pdfix.GetAccountAuthorization()
+        if not authorization.Authorize(license_name, license_key):
+            raise PdfixAuthorizationException(str(pdfix.GetError()))
+    elif license_key:
+        if not pdfix.GetStandarsAuthorization().Activate(license_key):
+            raise PdfixActivationException(str(pdfix.GetError()))
+    else:
+        print("No license name or key provided. Using PDFix SDK trial")
+
+
+def _render_and_infer(
+    page_index: int,
+    input_path: str,
+    model: str,
+    zoom: float,
+    license_name: str,
+    license_key: str,
+) -> dict:
+    """
+    Render one PDF page and run PaddleX models on it inside a worker process.
+
+    Pdfix objects are not fork-safe so each worker opens its own Pdfix handle
+    and its own copy of the document. Only the plain-dict PaddleX results are
+    sent back to the main process, where the template json is built in page
+    order.
+
+    Args:
+        page_index (int): PDF file page index.
+        input_path (string): Path to PDF document.
+        model (string): Paddle model for layout recognition.
+        zoom (float): Zoom level for rendering the page.
+        license_name (string): Pdfix sdk license name (e-mail)
+        license_key (string): Pdfix sdk license key
+
+    Returns:
+        PaddleX results for the page as a plain dictionary.
+    """
+    id: str = Path(input_path).stem
+
+    pdfix = GetPdfix()
+    if pdfix is None:
+        raise Exception("Pdfix Initialization failed")
+
+    _authorize_pdfix(pdfix, license_name, license_key)
+
+    doc = pdfix.OpenDoc(input_path, "")
+    if doc is None:
+        raise RuntimeError(f"{pdfix.GetError()} [{pdfix.GetErrorType()}]")
+
+    try:
+        page = doc.AcquirePage(page_index)
+        if page is None:
+            raise PdfixException("Unable to acquire the page")
+
+        try:
+            page_view = page.AcquirePageView(zoom, kRotate0)
+
+            try:
+                # Render the page as an image
+                image = create_image_from_pdf_page(page, page_view)
+
+                # Run layout model analysis and formula and table model analysis using the PaddleX engine
+                # (cached so a reused worker process loads the models only once)
+                paddlex = get_paddlex_engine(model)
+                results = paddlex.process_pdf_page_image_with_ai(image, id, page_index + 1)
+            finally:
+                page_view.Release()
+        finally:
+            page.Release()
+    finally:
+        doc.Close()
+
+    # Make sure queued page-image writes finish before the worker is recycled
+    get_background_writer().flush()
+
+    # Keep only picklable plain data for the main process
+    if "boxes" in results:
+        return {"boxes": results["boxes"]}
+    return {}
+
 
 class AutotagUsingPaddleXRecognition:
     """
@@ -30,7 +133,14 @@ class AutotagUsingPaddleXRecognition:
     """
 
     def __init__(
-        self, license_name: str, license_key: str, input_path: str, output_path: str, model: str, zoom: float
+        self,
+        license_name: str,
+        license_key: str,
+        input_path: str,
+        output_path: str,
+        model: str,
+        zoom: float,
+        num_workers: int = 1,
     ) -> None:
         """
         Initialize class for tagging pdf(s).
@@ -42,6 +152,7 @@ class AutotagUsingPaddleXRecognition:
             output_path (string): Path where tagged PDF should be saved
             model (string): Paddle model for layout recognition
             zoom (float): Zoom level for rendering the page
+            num_workers (int): Number of worker processes for page processing
         """
         self.license_name = license_name
         self.license_key = license_key
@@ -49,6 +160,7 @@ class AutotagUsingPaddleXRecognition:
         self.output_path_str = output_path
         self.model = model
         self.zoom = zoom
+        self.num_workers = num_workers
 
     def process_file(self) -> None:
         """
@@ -71,80 +183,95 @@ class AutotagUsingPaddleXRecognition:
         # Process images of each page
         num_pages = doc.GetNumPages()
         template_json_creator = TemplateJsonCreator()
-        max_formulas_and_tables_per_page = 1000
-        progress_bar = tqdm(total=num_pages * max_formulas_and_tables_per_page, desc="Processing pages")
-
-        for page_index in range(0, num_pages):
-            # Acquire the page
-            page = doc.AcquirePage(page_index)
-            if page is None:
-                raise PdfixException("Unable to acquire the page")
-
-            try:
-                # Process the page
-                self._process_pdf_file_page(
-                    id, page, page_index, template_json_creator, progress_bar, max_formulas_and_tables_per_page
-                )
-            except Exception:
-                raise
-            finally:
-                # Clean-up
-                page.Release()
+        progress_bar = tqdm(total=num_pages, desc="Processing pages")
+
+        # The engine is shared between documents; identical-page results must
+        # not leak from one document into the next
+        get_paddlex_engine(self.model).clear_page_cache()
+
+        if self.num_workers > 1:
+            # Rendering and inference run in worker processes, template json is
+            # built sequentially afterwards as it mutates shared state
+            results_per_page: dict[int, dict] = {}
+            mp_context = mp.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=self.num_workers, mp_context=mp_context) as executor:
+                future_to_page_index = {
+                    executor.submit(
+                        _render_and_infer,
+                        page_index,
+                        self.input_path_str,
+                        self.model,
+                        self.zoom,
+                        self.license_name,
+                        self.license_key,
+                    ): page_index
+                    for page_index in range(0, num_pages)
+                }
+                for future in as_completed(future_to_page_index):
+                    results_per_page[future_to_page_index[future]] = future.result()
+                    progress_bar.update(1)
+
+            for page_index in range(0, num_pages):
+                # Acquire the page
+                page = doc.AcquirePage(page_index)
+                if page is None:
+                    raise PdfixException("Unable to acquire the page")
+
+                try:
+                    page_view = page.AcquirePageView(self.zoom, kRotate0)
+
+                    try:
+                        # Create template json from PaddleX results for this page
+                        template_json_creator.process_page(
+                            results_per_page[page_index], page_index + 1, page_view, self.zoom
+                        )
+                    finally:
+                        page_view.Release()
+                finally:
+                    # Clean-up
+                    page.Release()
+        else:
+            self._run_page_pipeline(doc, id, num_pages, template_json_creator, progress_bar)
 
         # Create template json for whole document
         template_json_dict: dict = template_json_creator.create_json_dict_for_document(self.model, self.zoom)
 
         # Save template json to fileoutput_name = f"{id}-page{page_number}.png"
-        template_path = os.path.join(Path(__file__).parent.absolute(), f"../output/{id}-template_json.json")
-        with open(template_path, "w") as file:
-            file.write(json.dumps(template_json_dict, indent=2))
+        background_writer = get_background_writer()
+        template_path = str(_OUTPUT_DIR / f"{id}-template_json.json")
+        background_writer.write_file(template_path, dumps_bytes(template_json_dict, indent=True))
 
         # Remove old structure and prepare an empty structure tree
         doc.RemoveTags()
         doc.RemoveStructTree()
 
-        # Convert template json to memory stream
-        memory_stream = GetPdfix().CreateMemStream()
-        try:
-            raw_data, raw_data_size = self._json_to_raw_data(template_json_dict)
-            if not memory_stream.Write(0, raw_data, raw_data_size):
-                raise Exception(GetPdfix().GetError())
+        # Wait for the template json (and queued page images) to hit disk
+        # before loading the template back
+        background_writer.flush()
+
+        # Load template json from the file written above instead of copying
+        # the whole payload through an in-memory buffer
+        file_stream = pdfix.CreateFileStream(template_path, kPsReadOnly)
+        if file_stream is None:
+            raise PdfixException("Unable to open the template json file")
 
+        try:
             doc_template = doc.GetTemplate()
-            if not doc_template.LoadFromStream(memory_stream, kDataFormatJson):
+            if not doc_template.LoadFromStream(file_stream, kDataFormatJson):
                 raise Exception(f"Unable to open pdf : {pdfix.GetError()}")
         except Exception as e:
             raise PdfixException(f"Unable to load template json for tagging: {e}")
         finally:
-            memory_stream.Destroy()
+            file_stream.Destroy()
 
         # Autotag document
-        tagsParams = PdfTagsParams()
-        if not doc.AddTags(tagsParams):
+        if not doc.AddTags(_TAGS_PARAMS):
             raise Exception(pdfix.GetError())
 
         # Save the processed document
         if not doc.Save(self.output_path_str, kSaveFull):
             raise RuntimeError(f"{pdfix.GetError()} [{pdfix.GetErrorType()}]")
 
-    def _json_to_raw_data(self, json_dict: dict) -> tuple[ctypes.Array[ctypes.c_ubyte], int]:
-        """
-        Converts a JSON dictionary into a raw byte array (c_ubyte array) that can be used for low-level data operations.
-
-        Parameters:
-            json_dict (dict): A Python dictionary to be converted into JSON format and then into raw bytes.
-
-        Returns:
-            tuple: A tuple containing:
-                - json_data_raw (ctypes.c_ubyte array): The raw byte array representation of the JSON data.
-                - json_data_size (int): The size of the JSON data in bytes.
-        """
-        json_str: str = json.dumps(json_dict)
-        json_data: bytearray = bytearray(json_str.encode("utf-8"))
-        json_data_size: int = len(json_str)
-        json_data_raw: ctypes.Array[ctypes.c_ubyte] = (ctypes.c_ubyte * json_data_size).from_buffer(json_data)
-        return json_data_raw, json_data_size
-
     def _authorize(self, pdfix: Pdfix) -> None:
         """
         Tries to authorize or activate Pdfix license.
@@ -152,57 +279,172 @@ class AutotagUsingPaddleXRecognition:
         Args:
             pdfix (Pdfix): Pdfix sdk instance.
         """
+        _authorize_pdfix(pdfix, self.license_name, self.license_key)
 
-        if self.license_name and self.license_key:
-            authorization = pdfix.GetAccountAuthorization()
-            if not authorization.Authorize(self.license_name, self.license_key):
-                raise PdfixAuthorizationException(str(pdfix.GetError()))
-        elif self.license_key:
-            if not pdfix.GetStandarsAuthorization().Activate(self.license_key):
-                raise PdfixActivationException(str(pdfix.GetError()))
-        else:
-            print("No license name or key provided. Using PDFix SDK trial")
-
-    def _process_pdf_file_page(
+    def _run_page_pipeline(
         self,
+        doc: PdfDoc,
         id: str,
-        page: PdfPage,
-        page_index: int,
-        templateJsonCreator: TemplateJsonCreator,
+        num_pages: int,
+        template_json_creator: TemplateJsonCreator,
         progress_bar: tqdm,
-        max_formulas_and_tables_per_page: int,
     ) -> None:
         """
-        Create template json for current PDF document page.
+        Process all pages through a 3-stage pipeline so that page rendering,
+        PaddleX inference and template json creation overlap.
+
+        Stage A (thread) renders pages to images, stage B (thread) runs the
+        PaddleX models with one long-lived engine, stage C (this thread)
+        builds the template json strictly in page order and releases the page
+        resources.
 
         Args:
+            doc (PdfDoc): Opened PDF document.
             id (string): PDF document name.
-            page (PdfPage): The PDF document page to process.
-            page_index (int): PDF file page index.
-            progress_bar (tqdm): Progress bar that we update for each model
-                call.
-            max_formulas_and_tables_per_page (int): Our estimation how many
-                tables and formulas can be in one page.
+            num_pages (int): Number of pages in the document.
+            template_json_creator (TemplateJsonCreator): Template json builder
+                shared by all pages.
+            progress_bar (tqdm): Progress bar that we update for each
+                finished page.
         """
-        page_number = page_index + 1
+        render_queue: queue.Queue = queue.Queue(maxsize=PADDLEX_BATCH_SIZE)
+        inference_queue: queue.Queue = queue.Queue(maxsize=PADDLEX_BATCH_SIZE)
+        errors: list[Exception] = []
 
-        # Define rotation for rendering the page
-        page_view = page.AcquirePageView(self.zoom, kRotate0)
+        def render_pages() -> None:
+            # Stage A: acquire and render pages
+            try:
+                for page_index in range(0, num_pages):
+                    if errors:
+                        break
+
+                    page = doc.AcquirePage(page_index)
+                    if page is None:
+                        raise PdfixException("Unable to acquire the page")
+
+                    try:
+                        page_view = page.AcquirePageView(self.zoom, kRotate0)
+                    except Exception:
+                        page.Release()
+                        raise
+
+                    try:
+                        image = create_image_from_pdf_page(page, page_view)
+                    except Exception:
+                        page_view.Release()
+                        page.Release()
+                        raise
+
+                    # Timed put that re-checks for errors so a failing stage B
+                    # cannot leave us blocked on a full queue forever
+                    while True:
+                        if errors:
+                            page_view.Release()
+                            page.Release()
+                            return
+                        try:
+                            render_queue.put((page_index, image, page, page_view), timeout=0.1)
+                            break
+                        except queue.Full:
+                            continue
+            except Exception as exception:
+                errors.append(exception)
+            finally:
+                render_queue.put(None)
 
+        def infer_pages() -> None:
+            # Stage B: run PaddleX models, reusing one engine for all pages
+            paddlex = get_paddlex_engine(self.model)
+            batch: list[tuple] = []
+            saw_sentinel = False
+            try:
+                finished = False
+                while not finished:
+                    item = render_queue.get()
+                    if item is None:
+                        saw_sentinel = True
+                        break
+
+                    # Grow the batch while more rendered pages are ready, with
+                    # a time-based flush so a slow render does not stall us
+                    batch = [item]
+                    while len(batch) < PADDLEX_BATCH_SIZE:
+                        try:
+                            item = render_queue.get(timeout=0.1)
+                        except queue.Empty:
+                            break
+                        if item is None:
+                            saw_sentinel = True
+                            finished = True
+                            break
+                        batch.append(item)
+
+                    results_list: list = [{}] * len(batch)
+                    if not errors:
+                        images = [image for _, image, _, _ in batch]
+                        page_numbers = [page_index + 1 for page_index, _, _, _ in batch]
+                        results_list = paddlex.process_pdf_page_images_with_ai(images, id, page_numbers)
+
+                    for (page_index, _, page, page_view), results in zip(batch, results_list):
+                        inference_queue.put((page_index, results, page, page_view))
+                    batch = []
+            except Exception as exception:
+                errors.append(exception)
+            finally:
+                # On error, release the in-flight batch and keep draining the
+                # render queue so stage A never stays blocked on a full queue
+                if errors:
+                    for _, _, page, page_view in batch:
+                        page_view.Release()
+                        page.Release()
+                    while not saw_sentinel:
+                        item = render_queue.get()
+                        if item is None:
+                            saw_sentinel = True
+                            break
+                        _, _, page, page_view = item
+                        page_view.Release()
+                        page.Release()
+                inference_queue.put(None)
+
+        render_thread = threading.Thread(target=render_pages, daemon=True)
+        inference_thread = threading.Thread(target=infer_pages, daemon=True)
+        render_thread.start()
+        inference_thread.start()
+
+        # Stage C: build template json in page order using a reorder buffer
+        pending: dict[int, tuple] = {}
+        next_page_index = 0
         try:
-            # Render the page as an image
-            image = create_image_from_pdf_page(page, page_view)
-
-            # Run layout model analysis and formula and table model analysis using the PaddleX engine
-            paddlex = PaddleXEngine(self.model)
-            results = paddlex.process_pdf_page_image_with_ai(
-                image, id, page_number, progress_bar, max_formulas_and_tables_per_page
-            )
-
-            # Create template json from PaddleX results for this page
-            templateJsonCreator.process_page(results, page_number, page_view, self.zoom)
-        except Exception:
-            raise
+            while True:
+                item = inference_queue.get()
+                if item is None:
+                    break
+
+                page_index, results, page, page_view = item
+                pending[page_index] = (results, page, page_view)
+
+                while next_page_index in pending:
+                    results, page, page_view = pending.pop(next_page_index)
+                    try:
+                        if not errors:
+                            template_json_creator.process_page(results, next_page_index + 1, page_view, self.zoom)
+                            progress_bar.update(1)
+                    except Exception as exception:
+                        errors.append(exception)
+                    finally:
+                        # Release resources
+                        page_view.Release()
+                        page.Release()
+                    next_page_index += 1
         finally:
-            # Release resources
-            page_view.Release()
+            render_thread.join()
+            inference_thread.join()
+
+            # Release resources of pages that were still in flight on error
+            for results, page, page_view in pending.values():
+                page_view.Release()
+                page.Release()
+
+        if errors:
+            raise errors[0]
@@ -0,0 +1,84 @@
+import functools
+import queue
+import threading
+from typing import Callable
+
+
+@functools.lru_cache(maxsize=None)
+def get_background_writer() -> "BackgroundWriter":
+    """
+    Return the process-wide background writer.
+
+    Returns:
+        Cached BackgroundWriter instance.
+    """
+    return BackgroundWriter()
+
+
+class BackgroundWriter:
+    """
+    Class that runs disk writes on a single background thread so the
+    processing pipeline does not stall on file I/O. Callers queue write tasks
+    and call flush before depending on their results.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initializes the task queue; the worker thread starts lazily with the
+        first submitted task.
+        """
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self._errors: list[Exception] = []
+
+    def submit(self, task: Callable[[], None]) -> None:
+        """
+        Queue one write task for the background thread.
+
+        Args:
+            task (Callable): Callable performing the write.
+        """
+        self._ensure_thread()
+        self._queue.put(task)
+
+    def write_file(self, path: str, data: bytes) -> None:
+        """
+        Queue writing data to path.
+
+        Args:
+            path (string): Destination file path.
+            data (bytes): File content.
+        """
+        self.submit(lambda: self._write_file(path, data))
+
+    def flush(self) -> None:
+        """
+        Block until all queued writes have finished and re-raise the first
+        error that occurred since the previous flush.
+        """
+        self._queue.join()
+        if self._errors:
+            error = self._errors[0]
+            self._errors.clear()
+            raise error
+
+    def _write_file(self, path: str, data: bytes) -> None:
+        with open(path, "wb") as file:
+            file.write(data)
+
+    def _ensure_thread(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            task = self._queue.get()
+            try:
+                task()
+            except Exception as exception:
+                self._errors.append(exception)
+            finally:
+                self._queue.task_done()
@@ -1,15 +1,17 @@
-import json
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
 
 from pdfixsdk import (
     GetPdfix,
-    PdfPage,
+    PdfDoc,
     kRotate0,
 )
 from tqdm import tqdm
 
-from ai import PaddleXEngine
+from ai import get_paddlex_engine
+from background_writer import get_background_writer
 from exceptions import PdfixException
+from json_utils import dumps_bytes
 from page_renderer import create_image_from_pdf_page
 from template_json import TemplateJsonCreator
 
@@ -29,6 +31,7 @@ class CreateTemplateJsonUsingPaddleXRecognition:
         self.output_path_str = output_path
         self.model = model
         self.zoom = zoom
+        self.paddlex = get_paddlex_engine(model)
 
     def process_file(self) -> None:
         """
@@ -48,74 +51,92 @@ class CreateTemplateJsonUsingPaddleXRecognition:
         # Process images of each page
         num_pages = doc.GetNumPages()
         template_json_creator = TemplateJsonCreator()
-        max_formulas_and_tables_per_page = 1000
-        progress_bar = tqdm(total=num_pages * max_formulas_and_tables_per_page, desc="Processing pages")
+        progress_bar = tqdm(total=num_pages, desc="Processing pages")
 
-        for page_index in range(0, num_pages):
-            # Acquire the page
-            page = doc.AcquirePage(page_index)
-            if page is None:
-                raise PdfixException("Unable to acquire the page")
+        # The engine is shared between documents; identical-page results must
+        # not leak from one document into the next
+        self.paddlex.clear_page_cache()
+
+        # Render the next page on a helper thread while PaddleX runs on the
+        # current one; the Paddle inference happens in native code outside the
+        # GIL so render and inference genuinely overlap
+        with ThreadPoolExecutor(max_workers=1) as render_executor:
+            current_future: Future = render_executor.submit(self._acquire_and_render, doc, 0)
+            next_future: Future | None = None
 
             try:
-                # Process the page
-                self._process_pdf_file_page(
-                    id, page, page_index, template_json_creator, progress_bar, max_formulas_and_tables_per_page
-                )
-            except Exception:
-                raise
+                for page_index in range(0, num_pages):
+                    page, page_view, image = current_future.result()
+
+                    # Prefetch the next page render
+                    if page_index + 1 < num_pages:
+                        next_future = render_executor.submit(self._acquire_and_render, doc, page_index + 1)
+
+                    try:
+                        # Run layout model analysis and formula and table model analysis using the PaddleX engine
+                        results = self.paddlex.process_pdf_page_image_with_ai(image, id, page_index + 1)
+
+                        # Create template json from PaddleX results for this page
+                        template_json_creator.process_page(results, page_index + 1, page_view, self.zoom)
+                        progress_bar.update(1)
+                    finally:
+                        # Clean-up
+                        page_view.Release()
+                        page.Release()
+
+                    if next_future is not None:
+                        current_future = next_future
+                        next_future = None
             finally:
-                # Clean-up
-                page.Release()
+                # Release the prefetched page when the loop exits early
+                if next_future is not None:
+                    try:
+                        page, page_view, image = next_future.result()
+                        page_view.Release()
+                        page.Release()
+                    except Exception:
+                        pass
 
         # Create template json for whole document
         template_json_dict: dict = template_json_creator.create_json_dict_for_document(self.model, self.zoom)
         output_data: dict = {"content": template_json_dict}
 
         # Save template json
-        with open(self.output_path_str, "w") as file:
-            file.write(json.dumps(output_data, indent=2))
-
-    def _process_pdf_file_page(
-        self,
-        id: str,
-        page: PdfPage,
-        page_index: int,
-        templateJsonCreator: TemplateJsonCreator,
-        progress_bar: tqdm,
-        max_formulas_and_tables_per_page: int,
-    ) -> None:
+        with open(self.output_path_str, "wb") as file:
+            file.write(dumps_bytes(output_data, indent=True))
+
+        # Wait for page images queued during processing to hit disk
+        get_background_writer().flush()
+
+    def _acquire_and_render(self, doc: PdfDoc, page_index: int) -> tuple:
         """
-        Create template json for current PDF document page.
+        Acquire one page with its view and render it as an image.
 
         Args:
-            id (string): PDF document name.
-            page (PdfPage): The PDF document page to process.
+            doc (PdfDoc): Opened PDF document.
             page_index (int): PDF file page index.
-            progress_bar (tqdm): Progress bar that we update for each model
-                call.
-            max_formulas_and_tables_per_page (int): Our estimation how many
-                tables and formulas can be in one page.
+
+        Returns:
+            Tuple of (page, page_view, image); the caller releases the page
+            and the view.
         """
-        page_number = page_index + 1
+        page = doc.AcquirePage(page_index)
+        if page is None:
+            raise PdfixException("Unable to acquire the page")
 
-        # Define rotation for rendering the page
-        page_view = page.AcquirePageView(self.zoom, kRotate0)
+        try:
+            # Define rotation for rendering the page
+            page_view = page.AcquirePageView(self.zoom, kRotate0)
+        except Exception:
+            page.Release()
+            raise
 
         try:
             # Render the page as an image
             image = create_image_from_pdf_page(page, page_view)
-
-            # Run layout model analysis and formula and table model analysis using the PaddleX engine
-            paddlex = PaddleXEngine(self.model)
-            results = paddlex.process_pdf_page_image_with_ai(
-                image, id, page_number, progress_bar, max_formulas_and_tables_per_page
-            )
-
-            # Create template json from PaddleX results for this page
-            templateJsonCreator.process_page(results, page_number, page_view, self.zoom)
         except Exception:
-            raise
-        finally:
-            # Release resources
             page_view.Release()
+            page.Release()
+            raise
+
+        return page, page_view, image
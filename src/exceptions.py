@@ -3,8 +3,9 @@ from pdfixsdk import GetPdfix
 
 class PdfixException(Exception):
     def __init__(self, message: str = "") -> None:
-        self.errno = GetPdfix().GetErrorType()
-        self.add_note(message if len(message) else str(GetPdfix().GetError()))
+        pdfix = GetPdfix()
+        self.errno = pdfix.GetErrorType()
+        self.add_note(message if len(message) else str(pdfix.GetError()))
 
 
 class PdfixAuthorizationException(Exception):
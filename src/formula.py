@@ -3,7 +3,7 @@ import json
 # import os
 # from pathlib import Path
 # import cv2
-from ai import PaddleXEngine
+from ai import get_paddlex_engine
 from page_renderer import convert_base64_image_to_matlike_image
 
 
@@ -54,7 +54,7 @@ class FormulaDescriptionUsingPaddle:
         # image_path = os.path.join(Path(__file__).parent.absolute(), f"../output/formula-{Path(input_path).stem}.png")
         # cv2.imwrite(image_path, image)
 
-        ai = PaddleXEngine()
+        ai = get_paddlex_engine()
         formula_rec = ai.process_formula_image_with_ai(image)
         content: dict = {"content": formula_rec}
 
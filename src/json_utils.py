@@ -0,0 +1,35 @@
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:
+    orjson = None  # type: ignore[assignment]
+
+try:
+    import ujson
+except ImportError:
+    ujson = None  # type: ignore[assignment]
+
+
+def dumps_bytes(data: Any, indent: bool = False) -> bytes:
+    """
+    Serialize data to UTF-8 encoded JSON bytes.
+
+    Uses orjson when available as it is much faster on the large per-page
+    template dictionaries and writes bytes directly. Falls back to ujson and
+    finally to the standard library.
+
+    Args:
+        data (Any): JSON-serializable data.
+        indent (bool): Whether to indent the output with 2 spaces.
+
+    Returns:
+        Serialized JSON as bytes.
+    """
+    if orjson is not None:
+        option = orjson.OPT_INDENT_2 if indent else 0
+        return orjson.dumps(data, option=option)
+    if ujson is not None:
+        return ujson.dumps(data, indent=2 if indent else 0, ensure_ascii=False).encode("utf-8")
+    return json.dumps(data, indent=2 if indent else None).encode("utf-8")
@@ -1,12 +1,18 @@
 import argparse
+import multiprocessing as mp
 import os
 import sys
 import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 
-from autotag import AutotagUsingPaddleXRecognition
-from create_template import CreateTemplateJsonUsingPaddleXRecognition
-from formula import FormulaDescriptionUsingPaddle
+from tqdm import tqdm
+
+# The subcommand implementations are imported lazily inside the functions
+# below: pulling in autotag/create_template/formula loads Paddle and the
+# Pdfix SDK, a multi-second cost that config and --help should not pay
+
+_CONFIG_PATH = (Path(__file__).resolve().parent / "../config.json").resolve()
 
 
 def set_arguments(
@@ -42,6 +48,13 @@ def set_arguments(
                 )
             case "name":
                 parser.add_argument("--name", type=str, help="PDFix license name")
+            case "num-workers":
+                parser.add_argument(
+                    "--num-workers",
+                    type=int,
+                    default=min(os.cpu_count() or 1, 4),
+                    help="Number of worker processes for page processing (default: min(cpu_count, 4))",
+                )
             case "output":
                 parser.add_argument(
                     "--output", "-o", type=str, required=required_output, help=f"The output {output_file_type} file"
@@ -64,9 +77,7 @@ def get_pdfix_config(path: str) -> None:
     Args:
         path (string): Destination path for config.json file
     """
-    config_path = os.path.join(Path(__file__).parent.absolute(), "../config.json")
-
-    with open(config_path, "r", encoding="utf-8") as file:
+    with open(_CONFIG_PATH, "r", encoding="utf-8") as file:
         if path is None:
             print(file.read())
         else:
@@ -75,33 +86,128 @@ def get_pdfix_config(path: str) -> None:
 
 
 def run_autotag_subcommand(args) -> None:
-    autotagging_pdf(args.name, args.key, args.input, args.output, args.model, args.zoom)
+    autotagging_pdf(args.name, args.key, args.input, args.output, args.model, args.zoom, args.num_workers)
 
 
 def autotagging_pdf(
-    license_name: str, license_key: str, input_path: str, output_path: str, model: str, zoom: float
+    license_name: str,
+    license_key: str,
+    input_path: str,
+    output_path: str,
+    model: str,
+    zoom: float,
+    num_workers: int = 1,
 ) -> None:
     """
     Autotagging PDF document with provided arguments
 
+    When input is a folder, every PDF document in it is tagged into the
+    output folder, with documents distributed across the worker processes.
+
     Args:
         license_name (string): Name used in authorization in PDFix-SDK
         license_key (string): Key used in authorization in PDFix-SDK
-        input_path (string): Path to PDF document
-        output_path (string): Path to PDF document
+        input_path (string): Path to PDF document or folder with PDF documents
+        output_path (string): Path to PDF document or folder
         model (string): Paddle layout model
         zoom (float): Zoom level for rendering the page
+        num_workers (int): Number of worker processes
     """
     if zoom < 1.0 or zoom > 10.0:
         raise Exception("Zoom level must between 1.0 and 10.0")
 
-    if input_path.lower().endswith(".pdf") and output_path.lower().endswith(".pdf"):
-        autotag = AutotagUsingPaddleXRecognition(license_name, license_key, input_path, output_path, model, zoom)
+    if num_workers < 1:
+        raise Exception("Number of workers must be at least 1")
+
+    if Path(input_path).is_dir():
+        autotag_folder(license_name, license_key, input_path, output_path, model, zoom, num_workers)
+    elif input_path.lower().endswith(".pdf") and output_path.lower().endswith(".pdf"):
+        from autotag import AutotagUsingPaddleXRecognition
+
+        autotag = AutotagUsingPaddleXRecognition(
+            license_name, license_key, input_path, output_path, model, zoom, num_workers
+        )
         autotag.process_file()
     else:
         raise Exception("Input and output file must be PDF documents")
 
 
+def _autotag_pdf_worker(
+    license_name: str, license_key: str, input_path: str, output_path: str, model: str, zoom: float
+) -> None:
+    """
+    Autotag one PDF document inside a worker process.
+
+    Args:
+        license_name (string): Name used in authorization in PDFix-SDK
+        license_key (string): Key used in authorization in PDFix-SDK
+        input_path (string): Path to PDF document
+        output_path (string): Path to PDF document
+        model (string): Paddle layout model
+        zoom (float): Zoom level for rendering the page
+    """
+    from autotag import AutotagUsingPaddleXRecognition
+
+    autotag = AutotagUsingPaddleXRecognition(license_name, license_key, input_path, output_path, model, zoom)
+    autotag.process_file()
+
+
+def autotag_folder(
+    license_name: str,
+    license_key: str,
+    input_path: str,
+    output_path: str,
+    model: str,
+    zoom: float,
+    num_workers: int = 1,
+) -> None:
+    """
+    Autotag every PDF document in a folder using a pool of worker processes.
+
+    Each PDF is an independent Pdfix document so file-level parallelism is the
+    safest granularity. Workers are spawned (not forked) because Pdfix and
+    Paddle hold native state that is not fork-safe; each worker processes its
+    documents serially.
+
+    Args:
+        license_name (string): Name used in authorization in PDFix-SDK
+        license_key (string): Key used in authorization in PDFix-SDK
+        input_path (string): Path to folder with PDF documents
+        output_path (string): Path to folder for tagged PDF documents
+        model (string): Paddle layout model
+        zoom (float): Zoom level for rendering the page
+        num_workers (int): Number of worker processes for file processing
+    """
+    input_dir = Path(input_path)
+    output_dir = Path(output_path)
+    if not output_dir.is_dir():
+        raise Exception("Output must be an existing folder when input is a folder")
+
+    pdf_paths = sorted(input_dir.glob("*.pdf"))
+    if not pdf_paths:
+        raise Exception("No PDF documents found in the input folder")
+
+    max_workers = min(len(pdf_paths), num_workers)
+    mp_context = mp.get_context("spawn")
+    failures: list = []
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=mp_context) as executor:
+        future_to_path = {
+            executor.submit(
+                _autotag_pdf_worker, license_name, license_key, str(path), str(output_dir / path.name), model, zoom
+            ): path
+            for path in pdf_paths
+        }
+        for future in tqdm(as_completed(future_to_path), total=len(future_to_path), desc="Autotagging documents"):
+            path = future_to_path[future]
+            try:
+                future.result()
+            except Exception as exception:
+                failures.append(f"{path.name}: {exception}")
+
+    if failures:
+        raise Exception("Failed to autotag: " + "; ".join(failures))
+
+
 def run_formula_subcommand(args) -> None:
     describing_formula(args.input, args.output)
 
@@ -116,6 +222,8 @@ def describing_formula(input_path: str, output_path: str) -> None:
         output_path (string): Path to JSON file
     """
     if input_path.lower().endswith(".json") and output_path.lower().endswith(".json"):
+        from formula import FormulaDescriptionUsingPaddle
+
         ai = FormulaDescriptionUsingPaddle(input_path, output_path)
         ai.describe_formula()
     else:
@@ -140,6 +248,8 @@ def create_template_json(input_path: str, output_path: str, model: str, zoom: fl
         raise Exception("Zoom level must between 1.0 and 10.0")
 
     if input_path.lower().endswith(".pdf") and output_path.lower().endswith(".json"):
+        from create_template import CreateTemplateJsonUsingPaddleXRecognition
+
         template_creator = CreateTemplateJsonUsingPaddleXRecognition(input_path, output_path, model, zoom)
         template_creator.process_file()
     else:
@@ -166,7 +276,9 @@ def main() -> None:
         "tag",
         help="Run autotag PDF document",
     )
-    set_arguments(autotag_subparser, ["name", "key", "input", "output", "model", "zoom"], True, "PDF", "PDF")
+    set_arguments(
+        autotag_subparser, ["name", "key", "input", "output", "model", "zoom", "num-workers"], True, "PDF", "PDF"
+    )
     autotag_subparser.set_defaults(func=run_autotag_subcommand)
 
     # Formula subparser
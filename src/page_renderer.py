@@ -1,5 +1,5 @@
 import base64
-import tempfile
+import ctypes
 
 import cv2
 import numpy as np
@@ -10,8 +10,7 @@ from pdfixsdk import (
     PdfPageRenderParams,
     PdfPageView,
     kImageDIBFormatArgb,
-    kImageFormatJpg,
-    kPsTruncate,
+    kImageFormatBmp,
 )
 
 from exceptions import PdfixException
@@ -51,27 +50,34 @@ def create_image_from_pdf_page(pdf_page: PdfPage, page_view: PdfPageView) -> cv2
         if not pdf_page.DrawContent(render_params):
             raise PdfixException("Unable to draw the content")
 
-        # Save the rendered image to a temporary file in JPG format
-        with tempfile.NamedTemporaryFile(suffix=".jpg", delete=False) as temp_file:
-            file_stream = pdfix.CreateFileStream(temp_file.name, kPsTruncate)
-
-            try:
-                # Set image parameters (format and quality)
-                image_params = PdfImageParams()
-                image_params.format = kImageFormatJpg
-                image_params.quality = 100
-
-                # Save the image to the file stream
-                if not page_image.SaveToStream(file_stream, image_params):
-                    raise PdfixException("Unable to save the image to the stream")
-            except Exception:
-                raise
-            finally:
-                # Clean up resources
-                file_stream.Destroy()
-
-            # Return the saved image as a NumPy array using OpenCV
-            return cv2.imread(temp_file.name)
+        # Save the rendered image into an in-memory stream, avoiding the
+        # encode + disk write + decode round-trip of a temporary file
+        memory_stream = pdfix.CreateMemStream()
+        if memory_stream is None:
+            raise PdfixException("Unable to create the memory stream")
+
+        try:
+            # BMP keeps the render lossless and skips the JPEG codec entirely;
+            # size does not matter for the in-memory stream
+            image_params = PdfImageParams()
+            image_params.format = kImageFormatBmp
+
+            # Save the image to the memory stream
+            if not page_image.SaveToStream(memory_stream, image_params):
+                raise PdfixException("Unable to save the image to the stream")
+
+            data_size = memory_stream.GetSize()
+            raw_data = (ctypes.c_ubyte * data_size)()
+            if not memory_stream.Read(0, raw_data, data_size):
+                raise PdfixException("Unable to read the image from the stream")
+        except Exception:
+            raise
+        finally:
+            # Clean up resources
+            memory_stream.Destroy()
+
+        # Return the image as a NumPy array using OpenCV
+        return cv2.imdecode(np.frombuffer(raw_data, dtype=np.uint8), cv2.IMREAD_COLOR)
     except Exception:
         raise
     finally:
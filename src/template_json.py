@@ -1,13 +1,42 @@
 import json
-import math
-import os
 import sys
 from datetime import date
 from pathlib import Path
 from typing import Any
 
+import numpy as np
 from pdfixsdk import PdfDevRect, PdfPageView, PdfRect, __version__
 
+_MODULE_DIR = Path(__file__).resolve().parent
+
+# Static template attributes per recognized layout label; labels that need
+# per-region data (formula, number, table) are finished in the element loop
+_LABEL_TO_ELEMENT: dict[str, dict[str, Any]] = {
+    "abstract": {"comment": "abstract", "type": "pde_text"},
+    "algorithm": {"comment": "algorithm", "type": "pde_text"},
+    "aside_text": {"comment": "aside_text", "type": "pde_text"},  # TODO maybe add "|artifact"
+    "chart": {"comment": "chart", "type": "pde_image"},
+    "chart_title": {"comment": "chart_title", "tag": "Caption", "type": "pde_text"},
+    "content": {"comment": "content", "type": "pde_text"},
+    "doc_title": {"comment": "doc_title", "tag": "Title", "type": "pde_text"},
+    "figure_title": {"comment": "figure_title", "tag": "Caption", "type": "pde_text"},
+    "footer": {"flag": "footer|artifact", "type": "pde_text"},
+    "footer_image": {"flag": "footer|artifact", "type": "pde_image"},
+    "footnote": {"comment": "footnote", "type": "pde_text"},
+    "formula": {"comment": "formula", "tag": "Formula", "type": "pde_image"},
+    "formula_number": {"comment": "formula_number", "type": "pde_text"},
+    "header": {"flag": "header|artifact", "type": "pde_text"},
+    "header_image": {"flag": "header|artifact", "type": "pde_image"},
+    "image": {"type": "pde_image"},
+    "number": {"comment": "number", "type": "pde_text"},
+    "paragraph_title": {"comment": "paragraph_title", "heading": "h1", "type": "pde_text"},
+    "reference": {"comment": "reference", "tag": "Reference", "type": "pde_text"},
+    "seal": {"comment": "seal", "flag": "artifact", "type": "pde_image"},
+    "table": {"type": "pde_table"},
+    "table_title": {"comment": "table_title", "type": "pde_text"},
+    "text": {"type": "pde_text"},
+}
+
 
 class TemplateJsonCreator:
     """
@@ -76,7 +105,7 @@ class TemplateJsonCreator:
         Returns:
             The current version of the Docker image.
         """
-        config_path = os.path.join(Path(__file__).parent.absolute(), f"../{self.CONFIG_FILE}")
+        config_path = _MODULE_DIR / f"../{self.CONFIG_FILE}"
         try:
             with open(config_path, "r", encoding="utf-8") as f:
                 config = json.load(f)
@@ -132,146 +161,66 @@ class TemplateJsonCreator:
         elements: list = []
 
         # do not process if nothing is for processing
-        if "boxes" not in results:
+        if "boxes" not in results or not results["boxes"]:
             return elements
 
-        for result in results["boxes"]:
+        # One native call per page instead of one per "number" region
+        page_height = page_view.GetDeviceHeight()
+
+        # Round all box corners in one shot: floor the min corner, ceil the max
+        coordinates = np.asarray([result["coordinate"] for result in results["boxes"]], dtype=np.float64)
+        min_corners = np.floor(coordinates[:, :2]).astype(np.int32)
+        max_corners = np.ceil(coordinates[:, 2:]).astype(np.int32)
+
+        for index, result in enumerate(results["boxes"]):
             element: dict[str, Any] = {}
 
             rect = PdfDevRect()
-            rect.left = math.floor(result["coordinate"][0])  # min_x
-            rect.top = math.floor(result["coordinate"][1])  # min_y
-            rect.right = math.ceil(result["coordinate"][2])  # max_x
-            rect.bottom = math.ceil(result["coordinate"][3])  # max_y
+            rect.left = int(min_corners[index, 0])  # min_x
+            rect.top = int(min_corners[index, 1])  # min_y
+            rect.right = int(max_corners[index, 0])  # max_x
+            rect.bottom = int(max_corners[index, 1])  # max_y
             bbox = page_view.RectToPage(rect)
             element["bbox"] = [str(bbox.left), str(bbox.bottom), str(bbox.right), str(bbox.top)]
 
-            # Determine element type
+            # Determine element type with one lookup instead of chained branches
             label = result["label"].lower()
-            match label:
-                case "abstract":
-                    element["comment"] = "abstract"
-                    element["type"] = "pde_text"
-
-                case "algorithm":
-                    element["comment"] = "algorithm"
-                    element["type"] = "pde_text"
-
-                case "aside_text":
-                    element["comment"] = "aside_text"  # TODO maybe add "|artifact"
-                    element["type"] = "pde_text"
-
-                case "chart":
-                    element["comment"] = "chart"
-                    element["type"] = "pde_image"
-
-                case "chart_title":
-                    element["comment"] = "chart_title"
-                    element["tag"] = "Caption"
-                    element["type"] = "pde_text"
-
-                case "content":
-                    element["comment"] = "content"
-                    element["type"] = "pde_text"
-
-                case "doc_title":
-                    element["comment"] = "doc_title"
-                    element["tag"] = "Title"
-                    element["type"] = "pde_text"
-
-                case "figure_title":
-                    element["comment"] = "figure_title"
-                    element["tag"] = "Caption"
-                    element["type"] = "pde_text"
-
-                case "footer":
-                    element["flag"] = "footer|artifact"
-                    element["type"] = "pde_text"
-
-                case "footer_image":
-                    element["flag"] = "footer|artifact"
-                    element["type"] = "pde_image"
-
-                case "footnote":
-                    element["comment"] = "footnote"
-                    element["type"] = "pde_text"
-
-                case "formula":
-                    element["comment"] = "formula"
-                    if "custom" in result:
-                        element["alt"] = result["custom"]
-                        # TODO associate file -> not possible in template json
-                    element["tag"] = "Formula"
-                    element["type"] = "pde_image"
-                    element["id"] = ""  # for associate file - PDFIX SDK generate id pdfutils simplehash
-                    pass
-
-                case "formula_number":
-                    element["comment"] = "formula_number"
-                    element["type"] = "pde_text"
-                    pass
-
-                case "header":
-                    element["flag"] = "header|artifact"
-                    element["type"] = "pde_text"
-
-                case "header_image":
-                    element["flag"] = "header|artifact"
-                    element["type"] = "pde_image"
-
-                case "image":
-                    element["type"] = "pde_image"
-
-                case "number":
-                    element["comment"] = "number"
-                    number_flag = self._is_footer_or_header(page_view, bbox)
-                    element["flag"] = f"{number_flag}|artifact"
-                    element["type"] = "pde_text"
-
-                case "paragraph_title":
-                    element["comment"] = "paragraph_title"
-                    element["heading"] = "h1"
-                    element["type"] = "pde_text"
-
-                case "reference":
-                    element["comment"] = "reference"
-                    element["tag"] = "Reference"
-                    element["type"] = "pde_text"
-
-                case "seal":
-                    element["comment"] = "seal"
-                    element["flag"] = "artifact"
-                    element["type"] = "pde_image"
-
-                case "table":
-                    if "custom" in result:
-                        create_one: dict = {}
-                        cell_elements: list = self._create_table_cells(result["custom"], page_view)
-                        create_one["elements"] = cell_elements
-                        create_one["query"] = {}
-                        create_one["statement"] = "$if"
-                        element_create: list = []
-                        element_create.append(create_one)
-                        template: dict = {}
-                        template["element_create"] = element_create
-                        element_template: dict = {}
-                        element_template["template"] = template
-                        element["element_template"] = element_template
-                        element["row_num"] = result["custom"]["rows"]
-                        element["col_num"] = result["custom"]["columns"]
-                        element["flag"] = "fixed"
-                    element["type"] = "pde_table"
-
-                case "table_title":
-                    element["comment"] = "table_title"
-                    element["type"] = "pde_text"
-
-                case "text":
-                    element["type"] = "pde_text"
-
-                case _:
-                    element["comment"] = f"Unknown type: {label}"
-                    element["type"] = "pde_text"
+            base_element = _LABEL_TO_ELEMENT.get(label)
+            if base_element is None:
+                element["comment"] = f"Unknown type: {label}"
+                element["type"] = "pde_text"
+            else:
+                element.update(base_element)
+
+                # Labels whose attributes depend on the region itself
+                match label:
+                    case "formula":
+                        if "custom" in result:
+                            element["alt"] = result["custom"]
+                            # TODO associate file -> not possible in template json
+                        element["id"] = ""  # for associate file - PDFIX SDK generate id pdfutils simplehash
+
+                    case "number":
+                        number_flag = self._is_footer_or_header(page_height, bbox)
+                        element["flag"] = f"{number_flag}|artifact"
+
+                    case "table":
+                        if "custom" in result:
+                            create_one: dict = {}
+                            cell_elements: list = self._create_table_cells(result["custom"], page_view)
+                            create_one["elements"] = cell_elements
+                            create_one["query"] = {}
+                            create_one["statement"] = "$if"
+                            element_create: list = []
+                            element_create.append(create_one)
+                            template: dict = {}
+                            template["element_create"] = element_create
+                            element_template: dict = {}
+                            element_template["template"] = template
+                            element["element_template"] = element_template
+                            element["row_num"] = result["custom"]["rows"]
+                            element["col_num"] = result["custom"]["columns"]
+                            element["flag"] = "fixed"
 
             elements.append(element)
 
@@ -293,12 +242,20 @@ class TemplateJsonCreator:
         """
         cells: list = []
 
-        for cell in result["cells"]:
+        if not result["cells"]:
+            return cells
+
+        # Round all cell corners in one shot: ceil the min corner, floor the max
+        coordinates = np.asarray([cell["bbox"] for cell in result["cells"]], dtype=np.float64)
+        min_corners = np.ceil(coordinates[:, :2]).astype(np.int32)
+        max_corners = np.floor(coordinates[:, 2:]).astype(np.int32)
+
+        for index, cell in enumerate(result["cells"]):
             rect = PdfDevRect()
-            rect.left = math.ceil(cell["bbox"][0])  # min_x
-            rect.top = math.ceil(cell["bbox"][1])  # min_y
-            rect.right = math.floor(cell["bbox"][2])  # max_x
-            rect.bottom = math.floor(cell["bbox"][3])  # max_y
+            rect.left = int(min_corners[index, 0])  # min_x
+            rect.top = int(min_corners[index, 1])  # min_y
+            rect.right = int(max_corners[index, 0])  # max_x
+            rect.bottom = int(max_corners[index, 1])  # max_y
             bbox = page_view.RectToPage(rect)
 
             create_cell: dict = {
@@ -329,17 +286,16 @@ class TemplateJsonCreator:
         """
         return "true" if value else "false"
 
-    def _is_footer_or_header(self, page_view: PdfPageView, bbox: PdfRect) -> str:
+    def _is_footer_or_header(self, page_height: float, bbox: PdfRect) -> str:
         """
         According to Y coordinate of bbox return if it is "header" or "footer"
 
         Args:
-            page_view (PdfPageView): Page view to get page heigh
+            page_height (float): Device height of the page view
             bbox (PdfRect): Bounding box in PDF coordinates (Y=0 is bottom)
 
         Returns:
             "header" or "footer"
         """
-        page_height = page_view.GetDeviceHeight()
         half_height = page_height / 2
         return "footer" if bbox.top < half_height else "header"